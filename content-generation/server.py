@@ -5,16 +5,32 @@ Serves a web interface and handles video processing requests.
 """
 
 import http.server
-import socketserver
+from http import HTTPStatus
 import json
+import logging
 import os
 import subprocess
+import threading
 import urllib.parse
+import glob
+import gzip
 import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from string import Template
+from typing import NamedTuple, Optional
+
+try:
+    import orjson  # Optional: much faster JSON encoding/decoding
+except ImportError:
+    orjson = None
 
 # Configuration
 PORT = 8000
+# HTTP/1.1 keeps connections alive between requests; every response sends Content-Length
+PROTOCOL_VERSION = 'HTTP/1.1'
 # server.py is in content-generation/
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(SCRIPT_DIR, 'data')  # content-generation/data only
@@ -23,66 +39,359 @@ TRANSCRIBED_LYRICS_DIR = os.path.join(DATA_DIR, 'transcribed-lyrics')
 SCRIPTS_DIR = os.path.join(SCRIPT_DIR, 'scripts')
 SCRIPT_PATH = os.path.join(SCRIPTS_DIR, 'download-and-transcribe.ts')
 LOGS_DIR = os.path.join(SCRIPT_DIR, 'logs')
+# DEBUG traces every request; the default only reports problems
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'WARNING').upper()
+# JSON bodies smaller than this are sent uncompressed even if the client accepts gzip
+GZIP_MIN_SIZE = 1024
+# The pipeline scripts already write song files as 2-space indented JSON, so
+# /api/song can send them from disk as-is. Set to 0 to re-serialize instead.
+SONG_JSON_PASSTHROUGH = os.environ.get('SONG_JSON_PASSTHROUGH', '1') != '0'
+# Preload song files into the JSON cache in the background at startup.
+WARM_SONG_CACHE = os.environ.get('WARM_SONG_CACHE', '1') != '0'
+
+# Environment for the processing scripts, built once at startup
+PROCESS_ENV = os.environ.copy()
+# Check for node_modules in content-generation
+_content_gen_node_modules = os.path.join(SCRIPT_DIR, 'node_modules')
+if os.path.exists(_content_gen_node_modules):
+    if 'NODE_PATH' in PROCESS_ENV:
+        PROCESS_ENV['NODE_PATH'] = f"{_content_gen_node_modules}:{PROCESS_ENV['NODE_PATH']}"
+    else:
+        PROCESS_ENV['NODE_PATH'] = _content_gen_node_modules
+
+logger = logging.getLogger('easy-song')
+
+# Pre-encoded response heads, filled with a status line and Content-Length
+STATUS_LINES = {
+    status.value: f'{PROTOCOL_VERSION} {status.value} {status.phrase}\r\n'.encode('latin-1')
+    for status in HTTPStatus
+}
+JSON_HEAD = b'%sContent-type: application/json\r\nAccess-Control-Allow-Origin: *\r\nVary: Accept-Encoding\r\nContent-Length: %d\r\n\r\n'
+JSON_GZIP_HEAD = b'%sContent-type: application/json\r\nContent-Encoding: gzip\r\nAccess-Control-Allow-Origin: *\r\nVary: Accept-Encoding\r\nContent-Length: %d\r\n\r\n'
+HTML_HEAD = b'%sContent-type: text/html\r\nContent-Length: %d\r\n\r\n'
+
+# Encoded (and gzipped) /api/songs response, keyed on the raw-lyrics directory
+# mtime. Stored as one tuple so request threads always see a matching set.
+_songs_cache = (None, None, None)
+
+# Song detail page, split around the embedded JSON so only the head needs
+# formatting per request and the tail is written as-is.
+SONG_PAGE_HEAD = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Song Details - $video_id</title>
+    <script src="https://cdn.tailwindcss.com"></script>
+</head>
+<body class="bg-gray-100 min-h-screen py-8">
+    <div class="max-w-7xl mx-auto px-4">
+        <div class="mb-4">
+            <a href="/" class="text-blue-600 hover:text-blue-800 font-medium">← Back to Home</a>
+        </div>
+        
+        <div class="bg-white rounded-lg shadow-lg p-6 mb-6">
+            <h1 class="text-3xl font-bold text-gray-800 mb-2">Song Details</h1>
+            <p class="text-gray-600 mb-4">
+                Video ID: <span class="font-mono text-sm">$video_id</span> | 
+                Source: <span class="font-mono text-sm">$file_type</span>
+            </p>
+            
+            <div class="mb-6">
+                <a 
+                    href="https://www.youtube.com/watch?v=$video_id" 
+                    target="_blank"
+                    class="inline-block px-4 py-2 bg-red-600 text-white rounded-lg hover:bg-red-700 transition-colors"
+                >
+                    Open on YouTube ↗
+                </a>
+            </div>
+            
+            <div class="grid grid-cols-1 lg:grid-cols-2 gap-6">
+                <!-- YouTube Video -->
+                <div>
+                    <h2 class="text-xl font-bold text-gray-800 mb-4">Video</h2>
+                    <div class="aspect-video bg-black rounded-lg overflow-hidden">
+                        <iframe
+                            width="100%"
+                            height="100%"
+                            src="https://www.youtube.com/embed/$video_id"
+                            frameborder="0"
+                            allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture"
+                            allowfullscreen
+                            class="w-full h-full"
+                        ></iframe>
+                    </div>
+                </div>
+                
+                <!-- JSON Data -->
+                <div>
+                    <h2 class="text-xl font-bold text-gray-800 mb-4">Data File</h2>
+                    <div class="bg-gray-900 rounded-lg p-4 overflow-auto max-h-[600px]">
+                        <pre class="text-green-400 text-xs font-mono whitespace-pre-wrap break-words"><code id="jsonData">""")
+SONG_PAGE_TAIL = """</code></pre>
+                    </div>
+                    <div class="mt-4">
+                        <button
+                            onclick="copyToClipboard()"
+                            class="px-4 py-2 bg-gray-600 text-white rounded-lg hover:bg-gray-700 transition-colors text-sm"
+                        >
+                            Copy JSON
+                        </button>
+                        <span id="copyStatus" class="ml-2 text-sm text-green-600"></span>
+                    </div>
+                </div>
+            </div>
+        </div>
+    </div>
+    
+    <script>
+        function copyToClipboard() {
+            const jsonText = document.getElementById('jsonData').textContent;
+            navigator.clipboard.writeText(jsonText).then(() => {
+                const status = document.getElementById('copyStatus');
+                status.textContent = 'Copied!';
+                setTimeout(() => {
+                    status.textContent = '';
+                }, 2000);
+            });
+        }
+    </script>
+</body>
+</html>""".encode('utf-8')
+
+def dumps_json(data, pretty=False):
+    """Serialize data to UTF-8 JSON bytes, using orjson when it's installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else None)
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(data).encode('utf-8')
+
+def gzip_json(body):
+    """Gzip a JSON body, or return None if it's too small to be worth it."""
+    if len(body) < GZIP_MIN_SIZE:
+        return None
+    # Level 1 is fast and still shrinks indented JSON several times over
+    return gzip.compress(body, compresslevel=1, mtime=0)
+
+def loads_json(raw):
+    """Parse JSON from bytes, using orjson when it's installed."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+# YouTube URL (group 1) or a bare video ID (group 2)
+VIDEO_ID_RE = re.compile(
+    r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([a-zA-Z0-9_-]{11})'
+    r'|^([a-zA-Z0-9_-]{11})$'
+)
 
 def extract_video_id(url):
     """Extract YouTube video ID from various URL formats."""
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([a-zA-Z0-9_-]{11})',
-        r'^([a-zA-Z0-9_-]{11})$',  # Direct video ID
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
+    match = VIDEO_ID_RE.search(url)
+    if match:
+        return match.group(1) or match.group(2)
     return None
 
 def get_existing_songs():
     """Get list of existing song files from raw-lyrics directory."""
     songs = []
-    print(f"[DEBUG] Checking for songs in: {RAW_LYRICS_DIR}")
-    print(f"[DEBUG] Directory exists: {os.path.exists(RAW_LYRICS_DIR)}")
+    logger.debug("Checking for songs in: %s", RAW_LYRICS_DIR)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Directory exists: %s", os.path.exists(RAW_LYRICS_DIR))
     if os.path.exists(RAW_LYRICS_DIR):
         try:
-            files = os.listdir(RAW_LYRICS_DIR)
-            print(f"[DEBUG] Found {len(files)} files in directory")
-            for file in files:
-                if file.endswith('.json'):
-                    video_id = file.replace('.json', '')
-                    songs.append(video_id)
+            # scandir entries carry the file type, so no extra stat per file
+            with os.scandir(RAW_LYRICS_DIR) as entries:
+                songs = [
+                    entry.name[:-5] for entry in entries
+                    if entry.name.endswith('.json') and entry.is_file()
+                ]
         except Exception as e:
-            print(f"[ERROR] Failed to list directory: {e}")
+            logger.error("Failed to list directory: %s", e)
     else:
-        print(f"[ERROR] Directory does not exist: {RAW_LYRICS_DIR}")
-    print(f"[DEBUG] Returning {len(songs)} songs")
-    return sorted(songs)
+        logger.error("Directory does not exist: %s", RAW_LYRICS_DIR)
+    logger.debug("Returning %s songs", len(songs))
+    songs.sort()
+    return songs
+
+class SongFileCache:
+    """Thread-safe LRU of values derived from song files.
+    
+    Keyed on (path, st_mtime_ns, st_size) from fstat of the open file, so a
+    rewritten file is reloaded. Misses are built from that same open file,
+    never by reopening the path.
+    """
+    
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, f, build):
+        """Return the cached value for open file f, else build(f) and cache it."""
+        st = os.fstat(f.fileno())
+        key = (f.name, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = build(f)
+        with self._lock:
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+_song_json_cache = SongFileCache()
+# Gzipped bodies are only built when a gzip client asks for them
+_song_json_gzip_cache = SongFileCache()
+_song_file_gzip_cache = SongFileCache()
+
+def load_song(f):
+    """Load an open song JSON file through the song JSON cache, as pretty JSON bytes."""
+    return _song_json_cache.get(f, lambda f: dumps_json(loads_json(f.read()), pretty=True))
+
+def gzip_song_json(f, pretty):
+    """Gzip the pretty JSON load_song returned for f (None if it's too small to bother)."""
+    return _song_json_gzip_cache.get(f, lambda f: gzip_json(pretty))
+
+def gzip_song_file(f):
+    """Gzip an open song JSON file as stored on disk (None if it's too small to bother)."""
+    return _song_file_gzip_cache.get(f, lambda f: gzip_json(f.read()))
+
+def open_song_file(video_id):
+    """Open a song's JSON file, preferring transcribed (has metadata) over raw.
+    
+    Returns (file, file_type), or (None, None) if neither file exists.
+    """
+    # Only look in content-generation/data/
+    for directory, file_type in ((TRANSCRIBED_LYRICS_DIR, 'transcribed'), (RAW_LYRICS_DIR, 'raw')):
+        try:
+            return open(os.path.join(directory, f'{video_id}.json'), 'rb'), file_type
+        except FileNotFoundError:
+            continue
+    return None, None
+
+def _json_stems(directory):
+    """Return the names (without extension) of the .json files in a directory."""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name[:-5] for entry in entries if entry.name.endswith('.json')}
+    except OSError:
+        return set()
 
 def check_existing_videos(video_ids):
     """Check which video IDs already exist in raw-lyrics or transcribed-lyrics."""
     existing = {
-        'raw_lyrics': [],
-        'transcribed_lyrics': [],
-        'both': []
+        'raw_lyrics': set(),
+        'transcribed_lyrics': set(),
+        'both': set()
     }
     
-    TRANSCRIBED_LYRICS_DIR = os.path.join(DATA_DIR, 'transcribed-lyrics')
+    # One directory scan each instead of two stats per video ID
+    raw_ids = _json_stems(RAW_LYRICS_DIR)
+    transcribed_ids = _json_stems(TRANSCRIBED_LYRICS_DIR)
     
     for video_id in video_ids:
-        raw_path = os.path.join(RAW_LYRICS_DIR, f'{video_id}.json')
-        transcribed_path = os.path.join(TRANSCRIBED_LYRICS_DIR, f'{video_id}.json')
-        
-        has_raw = os.path.exists(raw_path)
-        has_transcribed = os.path.exists(transcribed_path)
+        has_raw = video_id in raw_ids
+        has_transcribed = video_id in transcribed_ids
         
         if has_raw and has_transcribed:
-            existing['both'].append(video_id)
+            existing['both'].add(video_id)
         elif has_raw:
-            existing['raw_lyrics'].append(video_id)
+            existing['raw_lyrics'].add(video_id)
         elif has_transcribed:
-            existing['transcribed_lyrics'].append(video_id)
+            existing['transcribed_lyrics'].add(video_id)
     
     return existing
 
+def warm_song_cache():
+    """Load song files into the song JSON cache so first page views are hot."""
+    video_ids = sorted(_json_stems(TRANSCRIBED_LYRICS_DIR) | _json_stems(RAW_LYRICS_DIR))
+    # Loading more than the cache holds would just evict earlier entries
+    video_ids = video_ids[:_song_json_cache.maxsize]
+    
+    def warm(video_id):
+        try:
+            f, _ = open_song_file(video_id)
+            if f is None:
+                return False
+            with f:
+                load_song(f)
+            return True
+        except Exception as e:
+            logger.warning("Could not preload song %s: %s", video_id, e)
+            return False
+    
+    # Overlap the file reads across a few threads rather than one at a time
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        loaded = sum(pool.map(warm, video_ids))
+    logger.info("Preloaded %s song(s) into cache", loaded)
+
+class NodeCommand(NamedTuple):
+    """How to invoke Node 20 for the processing script."""
+    node_cmd: Optional[str]
+    use_nvm_bash: bool
+    nvm_source: Optional[str]
+
+def _node_version(path):
+    """Version tuple from an nvm node path, e.g. (20, 19, 5); () if it doesn't parse."""
+    match = re.search(r'/v(\d+(?:\.\d+)*)/bin/node$', path)
+    return tuple(int(part) for part in match.group(1).split('.')) if match else ()
+
+def _find_nvm_node():
+    """Return the latest Node 20 installed through nvm, or None."""
+    nvm_nodes = glob.glob(os.path.expanduser('~/.nvm/versions/node/v20*/bin/node'))
+    # Compare versions numerically so v20.19.5 beats v20.9.0
+    return max(nvm_nodes, key=_node_version) if nvm_nodes else None
+
+@lru_cache(maxsize=1)
+def resolve_node():
+    """Find a Node v20 binary once; the result is reused by every request."""
+    # Use Node v20 - try multiple methods to find it
+    # Method 1: Try nvm to use Node 20 (most common)
+    node_cmd = _find_nvm_node()
+    if node_cmd:
+        logger.info("Using Node from nvm: %s", node_cmd)
+    
+    # Method 2: Try common Node 20 installation paths
+    if not node_cmd:
+        common_paths = [
+            '/usr/local/bin/node20',
+            '/usr/bin/node20',
+            '/opt/homebrew/bin/node20',
+            os.path.expanduser('~/.nvm/versions/node/v20.0.0/bin/node'),
+            os.path.expanduser('~/.nvm/versions/node/v20.11.0/bin/node'),
+            os.path.expanduser('~/.nvm/versions/node/v20.10.0/bin/node'),
+        ]
+        for path in common_paths:
+            if os.path.exists(path):
+                node_cmd = path
+                logger.info("Using Node from path: %s", node_cmd)
+                break
+    
+    # Method 3: Try using nvm via shell (if nvm is available)
+    use_nvm_bash = False
+    nvm_source = None
+    if not node_cmd:
+        nvm_source = os.path.expanduser('~/.nvm/nvm.sh')
+        if os.path.exists(nvm_source):
+            use_nvm_bash = True
+            logger.info("Using nvm via bash wrapper")
+        else:
+            # Fallback to regular node (might not work but worth trying)
+            node_cmd = 'node'
+            logger.warning("Using default node (may not be v20)")
+    
+    return NodeCommand(node_cmd, use_nvm_bash, nvm_source)
+
 class VideoProcessorHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = PROTOCOL_VERSION
+    # Drop idle keep-alive connections so they don't hold a thread forever
+    timeout = 60
+    
     def __init__(self, *args, **kwargs):
         # Serve files from content-generation directory
         super().__init__(*args, directory=SCRIPT_DIR, **kwargs)
@@ -105,6 +414,8 @@ class VideoProcessorHandler(http.server.SimpleHTTPRequestHandler):
         if self.path == '/api/process':
             self.handle_process()
         else:
+            # The request body was never read, so this connection can't be reused
+            self.close_connection = True
             self.send_error(404)
     
     def serve_index(self):
@@ -113,24 +424,29 @@ class VideoProcessorHandler(http.server.SimpleHTTPRequestHandler):
         if os.path.exists(index_path):
             with open(index_path, 'rb') as f:
                 content = f.read()
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(content)
+            self.send_bytes(HTML_HEAD, content)
         else:
             self.send_error(404)
     
     def serve_songs_list(self):
         """Serve JSON list of existing songs."""
-        print(f"[GET] /api/songs - Fetching songs list")
-        songs = get_existing_songs()
-        print(f"[GET] /api/songs - Returning {len(songs)} songs")
-        response = json.dumps({'songs': songs}).encode('utf-8')
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(response)
+        global _songs_cache
+        logger.debug("[GET] /api/songs - Fetching songs list")
+        try:
+            mtime = os.stat(RAW_LYRICS_DIR).st_mtime_ns
+        except OSError:
+            mtime = None
+        
+        # Adding or removing a song file bumps the directory mtime
+        cached_mtime, response, gzipped = _songs_cache
+        if mtime is None or mtime != cached_mtime:
+            songs = get_existing_songs()
+            logger.debug("[GET] /api/songs - Returning %s songs", len(songs))
+            response = dumps_json({'songs': songs})
+            gzipped = gzip_json(response)
+            if mtime is not None:
+                _songs_cache = (mtime, response, gzipped)
+        self.send_json_bytes(response, gzipped)
     
     def serve_song_detail(self):
         """Serve HTML detail page for a specific song."""
@@ -141,120 +457,23 @@ class VideoProcessorHandler(http.server.SimpleHTTPRequestHandler):
             self.send_error(404, "Invalid video ID")
             return
         
-        print(f"[GET] /song/{video_id} - Serving detail page")
-        
-        # Check which files exist - only look in content-generation/data/
-        raw_path = os.path.join(RAW_LYRICS_DIR, f'{video_id}.json')
-        transcribed_path = os.path.join(TRANSCRIBED_LYRICS_DIR, f'{video_id}.json')
-        
-        # Prefer transcribed (has metadata), then raw
-        if os.path.exists(transcribed_path):
-            file_path = transcribed_path
-            file_type = 'transcribed'
-        else:
-            file_path = raw_path
-            file_type = 'raw'
-        
-        if not os.path.exists(file_path):
-            self.send_error(404, f"Song file not found for video ID: {video_id}")
-            return
+        logger.debug("[GET] /song/%s - Serving detail page", video_id)
         
         # Read the JSON file
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                song_data = json.load(f)
+            f, file_type = open_song_file(video_id)
+            if f is None:
+                self.send_error(404, f"Song file not found for video ID: {video_id}")
+                return
+            with f:
+                pretty_json = load_song(f)
         except Exception as e:
             self.send_error(500, f"Error reading song file: {str(e)}")
             return
         
-        # Generate HTML page
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Song Details - {video_id}</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-</head>
-<body class="bg-gray-100 min-h-screen py-8">
-    <div class="max-w-7xl mx-auto px-4">
-        <div class="mb-4">
-            <a href="/" class="text-blue-600 hover:text-blue-800 font-medium">← Back to Home</a>
-        </div>
-        
-        <div class="bg-white rounded-lg shadow-lg p-6 mb-6">
-            <h1 class="text-3xl font-bold text-gray-800 mb-2">Song Details</h1>
-            <p class="text-gray-600 mb-4">
-                Video ID: <span class="font-mono text-sm">{video_id}</span> | 
-                Source: <span class="font-mono text-sm">{file_type}</span>
-            </p>
-            
-            <div class="mb-6">
-                <a 
-                    href="https://www.youtube.com/watch?v={video_id}" 
-                    target="_blank"
-                    class="inline-block px-4 py-2 bg-red-600 text-white rounded-lg hover:bg-red-700 transition-colors"
-                >
-                    Open on YouTube ↗
-                </a>
-            </div>
-            
-            <div class="grid grid-cols-1 lg:grid-cols-2 gap-6">
-                <!-- YouTube Video -->
-                <div>
-                    <h2 class="text-xl font-bold text-gray-800 mb-4">Video</h2>
-                    <div class="aspect-video bg-black rounded-lg overflow-hidden">
-                        <iframe
-                            width="100%"
-                            height="100%"
-                            src="https://www.youtube.com/embed/{video_id}"
-                            frameborder="0"
-                            allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture"
-                            allowfullscreen
-                            class="w-full h-full"
-                        ></iframe>
-                    </div>
-                </div>
-                
-                <!-- JSON Data -->
-                <div>
-                    <h2 class="text-xl font-bold text-gray-800 mb-4">Data File</h2>
-                    <div class="bg-gray-900 rounded-lg p-4 overflow-auto max-h-[600px]">
-                        <pre class="text-green-400 text-xs font-mono whitespace-pre-wrap break-words"><code id="jsonData">{json.dumps(song_data, indent=2, ensure_ascii=False)}</code></pre>
-                    </div>
-                    <div class="mt-4">
-                        <button
-                            onclick="copyToClipboard()"
-                            class="px-4 py-2 bg-gray-600 text-white rounded-lg hover:bg-gray-700 transition-colors text-sm"
-                        >
-                            Copy JSON
-                        </button>
-                        <span id="copyStatus" class="ml-2 text-sm text-green-600"></span>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </div>
-    
-    <script>
-        function copyToClipboard() {{
-            const jsonText = document.getElementById('jsonData').textContent;
-            navigator.clipboard.writeText(jsonText).then(() => {{
-                const status = document.getElementById('copyStatus');
-                status.textContent = 'Copied!';
-                setTimeout(() => {{
-                    status.textContent = '';
-                }}, 2000);
-            }});
-        }}
-    </script>
-</body>
-</html>"""
-        
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(html.encode('utf-8'))
+        # Static page around the pretty-printed JSON; only the head varies
+        head = SONG_PAGE_HEAD.substitute(video_id=video_id, file_type=file_type)
+        self.send_bytes(HTML_HEAD, head.encode('utf-8'), pretty_json, SONG_PAGE_TAIL)
     
     def serve_song_data(self):
         """Serve raw JSON data for a specific song."""
@@ -265,49 +484,57 @@ class VideoProcessorHandler(http.server.SimpleHTTPRequestHandler):
             self.send_error(404, "Invalid video ID")
             return
         
-        print(f"[GET] /api/song/{video_id} - Serving JSON data")
+        logger.debug("[GET] /api/song/%s - Serving JSON data", video_id)
         
-        # Check which files exist - only look in content-generation/data/
-        raw_path = os.path.join(RAW_LYRICS_DIR, f'{video_id}.json')
-        transcribed_path = os.path.join(TRANSCRIBED_LYRICS_DIR, f'{video_id}.json')
-        
-        # Prefer transcribed (has metadata), then raw
-        if os.path.exists(transcribed_path):
-            file_path = transcribed_path
-        else:
-            file_path = raw_path
+        try:
+            f, _ = open_song_file(video_id)
+        except OSError as e:
+            self.send_error(500, f"Error reading song file: {str(e)}")
+            return
         
-        if not os.path.exists(file_path):
+        if f is None:
             self.send_error(404, f"Song file not found for video ID: {video_id}")
             return
         
+        if SONG_JSON_PASSTHROUGH:
+            # Every client gets the on-disk bytes, gzipped or not
+            with f:
+                if self.accepts_gzip():
+                    try:
+                        gzipped = gzip_song_file(f)
+                    except OSError as e:
+                        self.send_error(500, f"Error reading song file: {str(e)}")
+                        return
+                    if gzipped is not None:
+                        self.send_bytes(JSON_GZIP_HEAD, gzipped)
+                        return
+                self.send_json_file(f)
+            return
+        
         # Read and serve the JSON file
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                song_data = json.load(f)
-            
-            response = json.dumps(song_data, indent=2, ensure_ascii=False).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(response)
+            with f:
+                response = load_song(f)
+                gzipped = gzip_song_json(f, response) if self.accepts_gzip() else None
         except Exception as e:
             self.send_error(500, f"Error reading song file: {str(e)}")
+            return
+        
+        self.send_json_bytes(response, gzipped)
     
     def handle_process(self):
         """Handle video processing request."""
-        print(f"[POST] /api/process - Received request")
+        logger.debug("[POST] /api/process - Received request")
         content_length = int(self.headers['Content-Length'])
         post_data = self.rfile.read(content_length)
         
         try:
-            data = json.loads(post_data.decode('utf-8'))
+            data = loads_json(post_data)
             urls = data.get('urls', [])
-            print(f"[POST] /api/process - Received {len(urls)} URL(s)")
+            logger.debug("[POST] /api/process - Received %s URL(s)", len(urls))
             
             if not urls:
-                print(f"[POST] /api/process - Error: No URLs provided")
+                logger.debug("[POST] /api/process - Error: No URLs provided")
                 self.send_json_response({'success': False, 'error': 'No URLs provided'}, 400)
                 return
             
@@ -322,13 +549,13 @@ class VideoProcessorHandler(http.server.SimpleHTTPRequestHandler):
                 video_id = extract_video_id(url)
                 if video_id:
                     video_ids.append(video_id)
-                    print(f"[POST] /api/process - Extracted video ID: {video_id} from {url}")
+                    logger.debug("[POST] /api/process - Extracted video ID: %s from %s", video_id, url)
                 else:
                     invalid_urls.append(url)
-                    print(f"[POST] /api/process - Invalid URL: {url}")
+                    logger.debug("[POST] /api/process - Invalid URL: %s", url)
             
             if not video_ids:
-                print(f"[POST] /api/process - Error: No valid video IDs found")
+                logger.debug("[POST] /api/process - Error: No valid video IDs found")
                 self.send_json_response({
                     'success': False,
                     'error': 'No valid YouTube video IDs found',
@@ -338,26 +565,33 @@ class VideoProcessorHandler(http.server.SimpleHTTPRequestHandler):
             
             # Check which videos already exist
             existing = check_existing_videos(video_ids)
-            new_video_ids = [vid for vid in video_ids if vid not in existing['both'] and vid not in existing['raw_lyrics'] and vid not in existing['transcribed_lyrics']]
+            seen = existing['both'] | existing['raw_lyrics'] | existing['transcribed_lyrics']
+            new_video_ids = [vid for vid in video_ids if vid not in seen]
+            # Sets aren't JSON serializable; report each bucket as a list in submission order
+            unique_ids = list(dict.fromkeys(video_ids))
+            existing_lists = {
+                bucket: [vid for vid in unique_ids if vid in ids]
+                for bucket, ids in existing.items()
+            }
             
             if existing['both']:
-                print(f"[POST] /api/process - Found {len(existing['both'])} video(s) already fully processed")
+                logger.debug("[POST] /api/process - Found %s video(s) already fully processed", len(existing['both']))
             if existing['raw_lyrics']:
-                print(f"[POST] /api/process - Found {len(existing['raw_lyrics'])} video(s) with raw lyrics only")
+                logger.debug("[POST] /api/process - Found %s video(s) with raw lyrics only", len(existing['raw_lyrics']))
             if existing['transcribed_lyrics']:
-                print(f"[POST] /api/process - Found {len(existing['transcribed_lyrics'])} video(s) with transcribed lyrics only")
+                logger.debug("[POST] /api/process - Found %s video(s) with transcribed lyrics only", len(existing['transcribed_lyrics']))
             if new_video_ids:
-                print(f"[POST] /api/process - Processing {len(new_video_ids)} new video(s)")
+                logger.debug("[POST] /api/process - Processing %s new video(s)", len(new_video_ids))
             
             # If all videos already exist, return early
             if not new_video_ids:
-                print(f"[POST] /api/process - All videos already exist, skipping processing")
+                logger.debug("[POST] /api/process - All videos already exist, skipping processing")
                 self.send_json_response({
                     'success': True,
                     'message': 'All videos already exist',
                     'video_ids': video_ids,
                     'invalid_urls': invalid_urls,
-                    'existing': existing,
+                    'existing': existing_lists,
                     'skipped': True
                 })
                 return
@@ -368,46 +602,7 @@ class VideoProcessorHandler(http.server.SimpleHTTPRequestHandler):
                 # Use relative path from content-generation/ to the script
                 script_rel_path = os.path.relpath(SCRIPT_PATH, SCRIPT_DIR)
                 
-                # Use Node v20 - try multiple methods to find it
-                node_cmd = None
-                import glob
-                
-                # Method 1: Try nvm to use Node 20 (most common)
-                nvm_node_pattern = os.path.expanduser('~/.nvm/versions/node/v20*/bin/node')
-                nvm_nodes = glob.glob(nvm_node_pattern)
-                if nvm_nodes:
-                    # Use the latest Node 20 version found
-                    node_cmd = sorted(nvm_nodes)[-1]
-                    print(f"[POST] /api/process - Using Node from nvm: {node_cmd}")
-                
-                # Method 2: Try common Node 20 installation paths
-                if not node_cmd:
-                    common_paths = [
-                        '/usr/local/bin/node20',
-                        '/usr/bin/node20',
-                        '/opt/homebrew/bin/node20',
-                        os.path.expanduser('~/.nvm/versions/node/v20.0.0/bin/node'),
-                        os.path.expanduser('~/.nvm/versions/node/v20.11.0/bin/node'),
-                        os.path.expanduser('~/.nvm/versions/node/v20.10.0/bin/node'),
-                    ]
-                    for path in common_paths:
-                        if os.path.exists(path):
-                            node_cmd = path
-                            print(f"[POST] /api/process - Using Node from path: {node_cmd}")
-                            break
-                
-                # Method 3: Try using nvm via shell (if nvm is available)
-                use_nvm_bash = False
-                nvm_source = None
-                if not node_cmd:
-                    nvm_source = os.path.expanduser('~/.nvm/nvm.sh')
-                    if os.path.exists(nvm_source):
-                        use_nvm_bash = True
-                        print(f"[POST] /api/process - Using nvm via bash wrapper")
-                    else:
-                        # Fallback to regular node (might not work but worth trying)
-                        node_cmd = 'node'
-                        print(f"[POST] /api/process - Warning: Using default node (may not be v20)")
+                node_cmd, use_nvm_bash, nvm_source = resolve_node()
                 
                 # Create logs directory if it doesn't exist
                 os.makedirs(LOGS_DIR, exist_ok=True)
@@ -415,62 +610,61 @@ class VideoProcessorHandler(http.server.SimpleHTTPRequestHandler):
                 # Use a single log file that appends (always append to the same file)
                 log_file = os.path.join(LOGS_DIR, 'process.log')
                 
-                # Set environment variables
-                env = os.environ.copy()
-                # Check for node_modules in content-generation
-                content_gen_node_modules = os.path.join(SCRIPT_DIR, 'node_modules')
-                
-                if os.path.exists(content_gen_node_modules):
-                    if 'NODE_PATH' in env:
-                        env['NODE_PATH'] = f"{content_gen_node_modules}:{env['NODE_PATH']}"
-                    else:
-                        env['NODE_PATH'] = content_gen_node_modules
-                
                 # Add separator and timestamp to log for this batch
                 from datetime import datetime
                 timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                with open(log_file, 'a') as log:
-                    log.write(f"\n{'='*80}\n")
-                    log.write(f"[{timestamp}] Starting batch: {len(new_video_ids)} video(s): {', '.join(new_video_ids)}\n")
-                    log.write(f"{'='*80}\n")
-                    log.flush()
+                log_lines = [
+                    f"\n{'='*80}\n".encode('utf-8'),
+                    f"[{timestamp}] Starting batch: {len(new_video_ids)} video(s): {', '.join(new_video_ids)}\n".encode('utf-8'),
+                    f"{'='*80}\n".encode('utf-8'),
+                ]
                 
-                # Process each video ID separately (script only handles one at a time)
-                process_pids = []
-                for video_id in new_video_ids:
-                    # Build command for this single video
-                    # Note: Script always uses OpenAI Whisper now, no --openai flag needed
-                    if use_nvm_bash:
-                        escaped_script = script_rel_path.replace("'", "'\"'\"'")
-                        escaped_video_id = video_id.replace("'", "'\"'\"'")
-                        cmd = ['bash', '-c', f'source {nvm_source} && nvm use 20 > /dev/null 2>&1 && node -r ts-node/register {escaped_script} {escaped_video_id}']
-                    elif node_cmd:
-                        cmd = [node_cmd, '-r', 'ts-node/register', script_rel_path, video_id]
-                    else:
-                        cmd = ['node', '-r', 'ts-node/register', script_rel_path, video_id]
+                # Open the log once and share the fd as stdout for every process in the batch
+                log_fd = os.open(log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    # Process each video ID separately (script only handles one at a time)
+                    commands = []
+                    for video_id in new_video_ids:
+                        # Build command for this single video
+                        # Note: Script always uses OpenAI Whisper now, no --openai flag needed
+                        if use_nvm_bash:
+                            escaped_script = script_rel_path.replace("'", "'\"'\"'")
+                            escaped_video_id = video_id.replace("'", "'\"'\"'")
+                            cmd = ['bash', '-c', f'source {nvm_source} && nvm use 20 > /dev/null 2>&1 && node -r ts-node/register {escaped_script} {escaped_video_id}']
+                        elif node_cmd:
+                            cmd = [node_cmd, '-r', 'ts-node/register', script_rel_path, video_id]
+                        else:
+                            cmd = ['node', '-r', 'ts-node/register', script_rel_path, video_id]
+                        
+                        # Log this individual command
+                        log_lines.append(f"\n[Starting] Video ID: {video_id}\nCommand: {' '.join(cmd)}\n".encode('utf-8'))
+                        commands.append(cmd)
                     
-                    # Log this individual command
-                    with open(log_file, 'a') as log:
-                        log.write(f"\n[Starting] Video ID: {video_id}\n")
-                        log.write(f"Command: {' '.join(cmd)}\n")
-                        log.flush()
+                    # Write the batch header and all commands in one syscall, before any process starts
+                    # (joined rather than writev, which fails past IOV_MAX buffers)
+                    os.write(log_fd, b''.join(log_lines))
                     
-                    # Run in background (non-blocking) with logging (append mode)
-                    with open(log_file, 'a') as log:
-                        process = subprocess.Popen(
+                    # Popen returns right after exec, so a plain loop launches the batch quickly
+                    processes = []
+                    for cmd in commands:
+                        # Run in background (non-blocking) with logging (append mode)
+                        processes.append(subprocess.Popen(
                             cmd,
                             cwd=SCRIPT_DIR,
-                            stdout=log,
+                            stdout=log_fd,
                             stderr=subprocess.STDOUT,
                             text=True,
-                            env=env
-                        )
-                        process_pids.append(process.pid)
-                    
-                    print(f"[POST] /api/process - Started process for {video_id} (PID: {process.pid})")
+                            env=PROCESS_ENV
+                        ))
+                finally:
+                    os.close(log_fd)
+                
+                process_pids = [process.pid for process in processes]
+                for video_id, pid in zip(new_video_ids, process_pids):
+                    logger.debug("[POST] /api/process - Started process for %s (PID: %s)", video_id, pid)
                 
-                print(f"[POST] /api/process - Started {len(process_pids)} process(es), PIDs: {process_pids}")
-                print(f"[POST] /api/process - Log file: {log_file} (appending)")
+                logger.info("[POST] /api/process - Started %s process(es), PIDs: %s", len(process_pids), process_pids)
+                logger.debug("[POST] /api/process - Log file: %s (appending)", log_file)
                 
                 self.send_json_response({
                     'success': True,
@@ -478,14 +672,12 @@ class VideoProcessorHandler(http.server.SimpleHTTPRequestHandler):
                     'video_ids': video_ids,
                     'new_video_ids': new_video_ids,
                     'invalid_urls': invalid_urls,
-                    'existing': existing,
+                    'existing': existing_lists,
                     'process_ids': process_pids,
                     'log_file': log_file
                 })
             except Exception as e:
-                print(f"[POST] /api/process - Error starting process: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("[POST] /api/process - Error starting process")
                 error_msg = str(e)
                 # Check if it's a package.json parsing error
                 if 'package.json' in error_msg and 'SyntaxError' in error_msg:
@@ -496,45 +688,93 @@ class VideoProcessorHandler(http.server.SimpleHTTPRequestHandler):
                 }, 500)
         
         except json.JSONDecodeError as e:
-            print(f"[POST] /api/process - JSON decode error: {e}")
+            logger.debug("[POST] /api/process - JSON decode error: %s", e)
             self.send_json_response({'success': False, 'error': 'Invalid JSON'}, 400)
         except Exception as e:
-            print(f"[POST] /api/process - Unexpected error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[POST] /api/process - Unexpected error")
             self.send_json_response({'success': False, 'error': str(e)}, 500)
     
+    def send_json_file(self, f):
+        """Send an open JSON file unchanged, letting the kernel copy it to the socket."""
+        size = os.fstat(f.fileno()).st_size
+        self.log_request(200, size)
+        self.wfile.write(JSON_HEAD % (STATUS_LINES[200], size))
+        sent = self.connection.sendfile(f, 0, size)
+        if sent < size:
+            # File shrank mid-send (the pipeline rewrites in place); the response
+            # is short of its Content-Length, so the connection can't be reused
+            self.close_connection = True
+    
     def send_json_response(self, data, status=200):
         """Send JSON response."""
-        response = json.dumps(data).encode('utf-8')
-        self.send_response(status)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(response)
+        self.send_bytes(JSON_HEAD, dumps_json(data), status=status)
+    
+    def accepts_gzip(self):
+        """Whether Accept-Encoding lists gzip with a non-zero q-value."""
+        for coding in self.headers.get('Accept-Encoding', '').split(','):
+            name, *params = coding.split(';')
+            if name.strip().lower() != 'gzip':
+                continue
+            for param in params:
+                key, _, value = param.partition('=')
+                if key.strip().lower() == 'q':
+                    try:
+                        return float(value) > 0
+                    except ValueError:
+                        return False
+            return True
+        return False
+    
+    def send_json_bytes(self, body, gzipped=None):
+        """Send encoded JSON, using the gzipped copy if there is one and the client accepts it."""
+        if gzipped is not None and self.accepts_gzip():
+            self.send_bytes(JSON_GZIP_HEAD, gzipped)
+        else:
+            self.send_bytes(JSON_HEAD, body)
+    
+    def send_bytes(self, head, *chunks, status=200):
+        """Send a complete response using one of the pre-encoded heads."""
+        length = sum(len(chunk) for chunk in chunks)
+        self.log_request(status, length)
+        # Head and body go out in a single write
+        self.wfile.write(b''.join((head % (STATUS_LINES[status], length), *chunks)))
     
     def log_message(self, format, *args):
         """Override to customize logging."""
-        print(f"[{self.address_string()}] {format % args}")
+        logger.info("[%s] " + format, self.address_string(), *args)
 
 def main():
     """Start the server."""
-    # Print configuration for debugging
-    print(f"[CONFIG] Script directory: {SCRIPT_DIR}")
-    print(f"[CONFIG] Data directory: {DATA_DIR}")
-    print(f"[CONFIG] Raw lyrics directory: {RAW_LYRICS_DIR}")
-    print(f"[CONFIG] Scripts directory: {SCRIPTS_DIR}")
-    print(f"[CONFIG] Script path: {SCRIPT_PATH}")
-    print(f"[CONFIG] Script exists: {os.path.exists(SCRIPT_PATH)}")
-    print(f"[CONFIG] Logs directory: {LOGS_DIR}")
+    # getLevelName maps a known name to its number; anything else comes back as a string
+    level = logging.getLevelName(LOG_LEVEL)
+    if not isinstance(level, int):
+        level = logging.WARNING
+    logging.basicConfig(level=level, format='[%(levelname)s] %(message)s')
+    if level != logging.getLevelName(LOG_LEVEL):
+        logger.warning("Unknown LOG_LEVEL %r, using WARNING", LOG_LEVEL)
+    
+    # Log configuration for debugging
+    logger.info("Script directory: %s", SCRIPT_DIR)
+    logger.info("Data directory: %s", DATA_DIR)
+    logger.info("Raw lyrics directory: %s", RAW_LYRICS_DIR)
+    logger.info("Scripts directory: %s", SCRIPTS_DIR)
+    logger.info("Script path: %s", SCRIPT_PATH)
+    logger.info("Script exists: %s", os.path.exists(SCRIPT_PATH))
+    logger.info("Logs directory: %s", LOGS_DIR)
+    resolve_node()
     
     # Ensure directories exist
     os.makedirs(RAW_LYRICS_DIR, exist_ok=True)
     os.makedirs(LOGS_DIR, exist_ok=True)
     
+    if WARM_SONG_CACHE:
+        threading.Thread(target=warm_song_cache, daemon=True).start()
+    
     handler = VideoProcessorHandler
     
-    with socketserver.TCPServer(("", PORT), handler) as httpd:
+    # Each request runs on its own thread so slow handlers (e.g. /api/process)
+    # don't hold up /api/songs polls and song page loads.
+    with http.server.ThreadingHTTPServer(("", PORT), handler) as httpd:
         print(f"Server running at http://localhost:{PORT}/")
         print(f"Press Ctrl+C to stop")
         try: